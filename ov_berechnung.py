@@ -1,6 +1,10 @@
 import pandas as pd
+import numpy as np
+import heapq
 import itertools
+from collections import namedtuple
 from datetime import datetime, time
+from functools import lru_cache
 
 # -----------------------------------------------------------------------------
 # Extension‑ticket prices (CHF) for uncovered zones (24 h validity)
@@ -14,159 +18,412 @@ EXT_PRICES = {
 # -----------------------------------------------------------------------------
 # Helper functions
 
+@lru_cache(maxsize=None)
 def _parse_time(t):
+    # Only a handful of distinct "HH:MM" strings occur, so parse each once.
     return t if isinstance(t, time) else datetime.strptime(t, "%H:%M").time()
 
 
-def _in_range(t, start, end):
-    t, start, end = map(_parse_time, (t, start, end))
-    return (start <= end and start <= t <= end) or (start > end and (t >= start or t <= end))
+def _minutes(t):
+    t = _parse_time(t)
+    return t.hour * 60 + t.minute
 
 
-# Zone‑coverage utility --------------------------------------------------------
+_FULL_DAY = (0, 23*60 + 59, False)
+
+
+def _window(times):
+    """(start, end, wraps) in minutes of day for a ("HH:MM", "HH:MM") validity window."""
+    start, end = _minutes(times[0]), _minutes(times[1])
+    return start, end, start > end
+
+
+def _in_window(t, win):
+    """Whether minute of day *t* (int or array) falls into window *win*."""
+    start, end, wraps = win
+    if wraps:
+        return (t >= start) | (t <= end)
+    return (start <= t) & (t <= end)
 
 
-def _covers(zone_cov, zone_req):
-    """Return True if *zone_cov* covers *zone_req* (strings or lists).
-    Handles zone_cov/zone_req as str or list; recognizes 'ZURICH' and 'all'."""
-    # normalise cov
-    cov_list = zone_cov if isinstance(zone_cov, list) else [zone_cov]
-    req_list = zone_req if isinstance(zone_req, list) else [zone_req]
+if hasattr(np, "bitwise_count"):
+    _bitcount = np.bitwise_count
+else:  # numpy < 2.0
+    def _bitcount(a):
+        return np.unpackbits(a.view(np.uint8).reshape(a.shape + (8,)), axis=-1).sum(axis=-1)
 
-    # Full‑country GA‑style coverage
-    if "all" in cov_list:
-        return True
 
-    # Request is Switzerland‑wide; only GA covers it
-    if zone_req == "all":
+def _popcount(a):
+    """Number of set bits in every element of the zone mask array *a*."""
+    if a.dtype == object:  # Python‑int masks (see `_mask_dtype`)
+        return np.array([bin(x).count("1") for x in a.flat], dtype=np.int64).reshape(a.shape)
+    return _bitcount(a)
+
+
+# Zone‑coverage utility --------------------------------------------------------
+#
+# Zones are encoded as integer bitmasks: every numbered zone gets a dense bit,
+# bits 63 and 62 stand for Switzerland‑wide ('all') and canton ('ZURICH').
+# Up to 62 numbered zones fit below them into uint64 arrays; any further zones
+# take the bits above, with the arrays holding Python ints instead.
+
+ALL_BIT = 1 << 63
+ZURICH_BIT = 1 << 62
+_SPECIAL_MASK = ALL_BIT | ZURICH_BIT
+_SPECIAL_BITS = {"all": ALL_BIT, "ZURICH": ZURICH_BIT}
+
+
+def _zone_bits(journeys, options):
+    """Dense bit index for every numbered zone used by a journey or pass."""
+    zones = {}
+    for zl in [j["zones"] for j in journeys] + [s.get("coverage", {}).get("zones") for s in options]:
+        if isinstance(zl, list):
+            zones.update(dict.fromkeys(z for z in zl if z not in _SPECIAL_BITS))
+    return {z: i if i < 62 else i + 2 for i, z in enumerate(zones)}
+
+
+def _mask_dtype(bits):
+    """Array dtype for zone masks: uint64, or Python ints beyond 62 zones."""
+    return np.dtype(np.uint64) if len(bits) <= 62 else np.dtype(object)
+
+
+def _encode_zones(zones, bits):
+    """Bitmask for *zones* ('all', 'ZURICH' or a list of zones)."""
+    if not isinstance(zones, list):
+        zones = [zones]
+    mask = 0
+    for z in zones:
+        mask |= _SPECIAL_BITS[z] if z in _SPECIAL_BITS else 1 << bits[z]
+    return mask
+
+
+def _zone_masks(zone_lists, bits):
+    """Bitmask for each entry of *zone_lists* (0 for None); identical zone lists
+    are encoded once and share their mask."""
+    canon, masks = {}, []
+    for zones in zone_lists:
+        key = tuple(zones) if isinstance(zones, list) else zones
+        if key not in canon:
+            canon[key] = 0 if zones is None else _encode_zones(zones, bits)
+        masks.append(canon[key])
+    return masks
+
+
+def _covers(cov, req):
+    """True where zone mask *cov* covers zone mask *req* (ints or mask arrays)."""
+    return (((cov & ALL_BIT) != 0)                                    # GA‑style coverage
+            | (((cov & ZURICH_BIT) != 0) & ((req & ALL_BIT) == 0))    # canton covers anything short of 'all'
+            | ((req & ~cov) == 0))                                    # plain zone subset
+
+
+def _dominates(b, a):
+    """True if unlimited pass *b* is valid for every zone and departure time of *a*."""
+    if not _covers(b.zmask, a.zmask):
         return False
+    # time check – if b starts earlier or same and ends later or same
+    start_a, end_a, _ = a.win
+    start_b, end_b, wraps_b = b.win
+    # Convert both intervals to sets of minute indices for robust wrap check is overkill; assume 00‑23 full‑day -> superset.
+    return b.win == _FULL_DAY or (start_b <= start_a and (end_b >= end_a or wraps_b))
+
+
+def _dominance_table(passes):
+    """Boolean matrix whose entry [i, j] tells whether unlimited pass j dominates
+    unlimited pass i (indices into *passes*; other passes never dominate)."""
+    dom = np.zeros((len(passes), len(passes)), dtype=bool)
+    unlimited = [i for i, s in enumerate(passes) if s.kind == "unlimited"]
+    for i, j in itertools.permutations(unlimited, 2):
+        dom[i, j] = _dominates(passes[j], passes[i])
+    return dom
 
-    # Canton coverage covers any numeric zones and 'ZURICH' itself
-    if "ZURICH" in cov_list:
-        # covers canton request or any numeric zone list
-        if zone_req == "ZURICH":
-            return True
-        if isinstance(zone_req, list):
-            return True
-
-    # Otherwise compare numeric zone sets (lists)
-    if isinstance(zone_cov, list) and isinstance(zone_req, list):
-        return set(req_list).issubset(set(cov_list))
-    
-    if zone_req == "ZURICH":
-        return zone_cov in ("all", "ZURICH")
-    if zone_cov == "ZURICH" and isinstance(zone_req, list):
-        return True  # canton covers any numeric zones
-    # both lists of numerics?
-    if isinstance(zone_cov, list) and isinstance(zone_req, list):
-        return set(zone_req).issubset(zone_cov)
-    return False
-
-
-def _is_redundant(combo):
-    """True if any unlimited pass in *combo* is subsumed by another."""
-    unlimited = [s for s in combo if s.get("coverage", {}).get("type") == "unlimited"]
-    for a, b in itertools.permutations(unlimited, 2):
-        # if zones of a covered by b and time window of b is super/equal a
-        cov_a, cov_b = a["coverage"], b["coverage"]
-        if _covers(cov_b["zones"], cov_a["zones"]):
-            # time check – if b starts earlier or same and ends later or same
-            start_a, end_a = map(_parse_time, cov_a.get("times", ("00:00","23:59")))
-            start_b, end_b = map(_parse_time, cov_b.get("times", ("00:00","23:59")))
-            # Convert both intervals to sets of minute indices for robust wrap check is overkill; assume 00‑23 full‑day -> superset.
-            if (start_b == _parse_time("00:00") and end_b == _parse_time("23:59")) or (start_b <= start_a and (end_b >= end_a or start_b > end_b)):
-                return True
-    return False
+
+def _index_mask(ids):
+    """Bitmask with a bit set for each option index in *ids*."""
+    return sum(1 << i for i in ids)
+
+
+def _is_redundant(ids, dom):
+    """True if any unlimited pass among the pass indices *ids* is subsumed by another."""
+    return bool(dom[np.ix_(ids, ids)].any())
 
 # -----------------------------------------------------------------------------
 # Discount helper
 
-def _apply_discount(j, subs):
-    rates = [s["coverage"]["rate"] for s in subs if s.get("coverage", {}).get("type") == "discount"]
-    return j["full_price"] * min(rates, default=1.0)
+def _combo_rate(subs):
+    """Best discount rate among *subs*; it depends on the combo only, so callers
+    work it out once rather than per journey."""
+    return min((s.rate for s in subs), default=1.0)
 
 # -----------------------------------------------------------------------------
-# Per‑journey pricing
+# Per‑journey pricing (vectorised over all journeys)
+
+def _prepare_journeys(journeys, bits):
+    """Parse and encode every journey once, as arrays over all journeys."""
+    dtype = _mask_dtype(bits)
+    zmask = np.array(_zone_masks([j["zones"] for j in journeys], bits), dtype=dtype)
+    return {
+        "tmin": np.array([_minutes(j["time"]) for j in journeys], dtype=np.int16),
+        "zmask": zmask,
+        # only journeys over numbered zones can be topped up with extension tickets
+        "numbered": (zmask & np.array(_SPECIAL_MASK, dtype)) == 0,
+        # zone 110 counts twice towards extension tickets
+        "zone110": zmask & np.array(1 << bits[110] if 110 in bits else 0, dtype),
+        "full_price": np.array([j["full_price"] for j in journeys], dtype=float),
+        "count": np.array([j["count"] for j in journeys], dtype=float),
+    }
+
 
-def _journey_price(j, subs):
-    zones, dep = j["zones"], j["time"]
+# An option flattened for one search: its price and credit for the age (price
+# None if it is not sold for that age), coverage type, discount rate (1.0 for
+# other passes) and, for unlimited passes, zone mask, validity window and
+# coverage at every journey's departure (zero where the pass is not valid).
+Pass = namedtuple("Pass", "name price credit kind rate zmask win cover")
 
-    # 1️⃣ Unlimited coverage valid at departure
-    has_global, canton, numer = False, False, set()
-    for s in subs:
+
+def _prepare_passes(options, pj, bits, age):
+    """Flatten *options* into `Pass` records for *age*."""
+    passes = []
+    zmasks = _zone_masks([s.get("coverage", {}).get("zones") for s in options], bits)
+    for s, zmask in zip(options, zmasks):
         cov = s.get("coverage", {})
-        if cov.get("type") != "unlimited" or not _in_range(dep, *cov.get("times", ("00:00","23:59"))):
+        kind = cov.get("type", "none")
+        win, cover = None, None
+        if kind == "unlimited":
+            win = _window(cov.get("times", ("00:00","23:59")))
+            dtype = pj["zmask"].dtype
+            cover = np.where(_in_window(pj["tmin"], win), np.array(zmask, dtype), np.array(0, dtype))
+        else:
+            zmask = 0
+        passes.append(Pass(s["name"], s["price"].get(age), s.get("credit", {}).get(age, 0), kind,
+                           cov["rate"] if kind == "discount" else 1.0, zmask, win, cover))
+    return passes
+
+
+def _ext_prices(has_halbtax):
+    """Extension price indexed by the number of uncovered zones (4 meaning 4+)."""
+    low = EXT_PRICES["1-2 (halbtax)"] if has_halbtax else EXT_PRICES["1-2"]
+    return np.array([0.0, low, low, EXT_PRICES["3"], EXT_PRICES["4+"]])
+
+
+def _trip_prices(pj, cover, rate, has_halbtax):
+    """Price of every journey prepared by `_prepare_journeys` under the unlimited
+    coverage *cover*, discount *rate* and possibly Halbtax."""
+    # 1️⃣ Evaluate coverage
+    covered = _covers(cover, pj["zmask"])
+    numer = cover & ~np.array(_SPECIAL_MASK, cover.dtype)
+    extend = pj["numbered"] & (numer != 0)
+
+    # 2️⃣ Extension ticket for the missing zones
+    missing = pj["zmask"] & ~numer
+    cnt = _popcount(missing) + ((missing & pj["zone110"]) != 0)
+    ext = _ext_prices(has_halbtax)[np.minimum(cnt, 4)]
+
+    return np.where(covered, 0.0, np.where(extend, ext, pj["full_price"] * rate))
+
+
+_MAX_TABLE_WIDTH = 12
+
+
+def _price_table(pj, passes):
+    """Coverage rows of all passes and a lookup table of journey prices over them.
+
+    Only the distinct coverages that can change a journey's price matter for it
+    (special zones, or any zones for journeys over numbered zones); each gets a
+    bit in *rows*[pass, journey].  OR‑ing a combo's rows gives its coverage
+    state, the index into *prices*[journey, state, has_halbtax], which holds NaN
+    where the discounted full fare applies.  If some journey has too many
+    subsets the rows are the passes' coverage instead, and *prices* is None."""
+    n = len(pj["count"])
+    rows = np.zeros((len(passes), n), np.int64)
+    values = [{} for _ in range(n)]  # distinct relevant coverage -> bit, per journey
+    for i, s in enumerate(passes):
+        if s.cover is None:
             continue
-        zc = cov["zones"] if isinstance(cov["zones"], list) else [cov["zones"]]
-        if "all" in zc:
-            has_global = True; break
-        if "ZURICH" in zc:
-            canton = True
-        numer.update(z for z in zc if isinstance(z, int))
-
-    if has_global:
-        return 0.0
-
-    # 2️⃣ Evaluate coverage
-    if zones == "ZURICH":
-        return 0.0 if canton else _apply_discount(j, subs)
-
-    if isinstance(zones, list):
-        if canton or numer.issuperset(zones):
-            return 0.0
-        if canton or numer:
-            missing = [z for z in zones if z not in numer and not canton]
-            cnt = sum(2 if z == 110 else 1 for z in missing)
-            if cnt <= 2:
-                key = "1-2 (halbtax)" if any(s["name"] == "halbtax" for s in subs) else "1-2"
-                return EXT_PRICES[key]
-            return EXT_PRICES["3" if cnt == 3 else "4+"]
-
-    return _apply_discount(j, subs)
+        for j, cov in enumerate(s.cover.tolist()):
+            if cov & (ALL_BIT | ZURICH_BIT) or (cov and pj["numbered"][j]):
+                rows[i, j] = 1 << values[j].setdefault(cov, len(values[j]))
+    width = max(map(len, values), default=0)
+    if width > _MAX_TABLE_WIDTH:
+        empty = np.zeros(n, pj["zmask"].dtype)
+        return np.array([empty if s.cover is None else s.cover for s in passes]), None
+
+    subsets = np.arange(1 << width)
+    cover = np.zeros((n, len(subsets)), pj["zmask"].dtype)
+    for j, vals in enumerate(values):
+        for cov, b in vals.items():
+            cover[j, (subsets >> b) & 1 == 1] |= cov
+    grid = {key: a[:, None] for key, a in pj.items()}
+    # A NaN rate leaves NaN exactly where the full fare is paid
+    prices = np.stack([_trip_prices(grid, cover, np.nan, h) for h in (False, True)], axis=-1)
+    return rows, prices
+
+
+def _state_prices(pj, prices, state, rate, has_halbtax):
+    """Price of every journey for a combo with coverage *state* (see `_price_table`)."""
+    if prices is None:
+        return _trip_prices(pj, state, rate, has_halbtax)
+    price = prices[np.arange(len(state)), state, int(has_halbtax)]
+    return np.where(np.isnan(price), pj["full_price"] * rate, price)
+
+
+def _table_cost_loop(state, prices, half, full_price, count, rate):
+    """Scalar table lookup of `_state_prices` summed over all journeys, for numba to compile."""
+    total = 0.0
+    for j in range(state.shape[0]):
+        price = prices[j, state[j], half]
+        if np.isnan(price):
+            price = full_price[j] * rate
+        total += price * count[j]
+    return total
+
+
+@lru_cache(maxsize=None)
+def _table_cost_jit():
+    """`_table_cost_loop` compiled by numba (optional dependency), built on first use."""
+    from numba import njit
+    return njit(cache=True)(_table_cost_loop)
+
+
+def _trip_cost(pj, prices, state, rate, has_halbtax, jit=False):
+    """Total single‑ticket cost of all journeys (see `_state_prices`)."""
+    if not jit or prices is None:
+        # Summed in journey order like the compiled loop, so ties rank the same
+        return sum((_state_prices(pj, prices, state, rate, has_halbtax) * pj["count"]).tolist())
+    return _table_cost_jit()(state, prices, int(has_halbtax), pj["full_price"], pj["count"], rate)
 
 # -----------------------------------------------------------------------------
 # Optimisation
 
-def top_k_plans(journeys, options, age, k=3, fixed_sub_names=None):
+def _trip_lower_bound(pj, prices, state, rate):
+    """Cheapest price every journey can reach with coverage up to *state* and a
+    discount rate down to *rate*."""
+    # Pricing without Halbtax gives the cheaper 1‑2 zone extension
+    return np.minimum(_state_prices(pj, prices, state, rate, False), pj["full_price"] * rate)
+
+
+def top_k_plans(journeys, options, age, k=3, fixed_sub_names=None, jit=False):
+    """The *k* cheapest subscription plans for *age*.
+
+    With *jit* the trip costs are summed by a loop compiled with numba.  Loading
+    it costs a fraction of a second, so it only pays off for many journeys or
+    repeated calls."""
+    if k <= 0:
+        return []
+    bits = _zone_bits(journeys, options)
+    prepared = _prepare_journeys(journeys, bits)
+    passes = _prepare_passes(options, prepared, bits, age)
+
     fixed = set(fixed_sub_names or [])
-    fixed_passes = [s for s in options if s["name"] in fixed]
-    variable = [s for s in options if s["name"] not in fixed and s["name"] != "no_sub"]
-
-    plans = []
-    for r in range(len(variable)+1):
-        for extra in itertools.combinations(variable, r):
-            combo = fixed_passes + list(extra)
-            names = {s["name"] for s in combo}
-
-            # Skip redundant combos (dominated passes)
-            if _is_redundant(combo):
-                continue
-
-            # Age & dependency checks
-            if any(age not in s["price"] for s in combo):
-                continue
-            if any(n.startswith("halbtax_plus") for n in names) and "halbtax" not in names:
-                continue
-
-            fee = sum(s["price"][age] for s in combo)
-            trips = sum(_journey_price(j, combo) * j["count"] for j in journeys)
-            credit = sum(s.get("credit", {}).get(age, 0) for s in combo)
-            net = max(0.0, trips - credit)
-            total = fee + net
-
-            plans.append({
-                "subs": combo,
-                "subscription_cost": fee,
-                "other_cost": net,
-                "cost": total
-            })
+    fixed_ids = [i for i, s in enumerate(options) if s["name"] in fixed]
+    variable = [i for i, s in enumerate(options) if s["name"] not in fixed and s["name"] != "no_sub"]
+    fixed_passes = [passes[i] for i in fixed_ids]
+    dom = _dominance_table(passes)
+    rows, prices = _price_table(prepared, passes)
+
+    # Passes without a price for *age* can never be chosen; try cheap ones first
+    # so that good plans are found early and the bound tightens quickly.
+    order = sorted((i for i in variable if passes[i].price is not None),
+                   key=lambda i: passes[i].price)
+
+    # Halbtax Plus is only sold on top of Halbtax; option index bitmasks make
+    # that an integer test, also for the passes still left to add.
+    halbtax_mask = _index_mask(i for i, s in enumerate(options) if s["name"] == "halbtax")
+    plus_mask = _index_mask(i for i, s in enumerate(options) if s["name"].startswith("halbtax_plus"))
+    fixed_mask = _index_mask(fixed_ids)
+    rest_mask = [_index_mask(order[p:]) for p in range(len(order) + 1)]
+
+    # The coverage state is carried down the search one pass at a time; the
+    # state of every suffix of *order* bounds what the rest can still add.
+    suffix = np.zeros((len(order) + 1, len(journeys)), rows.dtype)
+    for p in reversed(range(len(order))):
+        suffix[p] = suffix[p + 1] | rows[order[p]]
+
+    # Trip costs only depend on the coverage state, so combos differing only in
+    # passes that change no journey's price share them.
+    trip_costs = {}  # (coverage state, has Halbtax, discount rate) -> trip costs
+
+    # The k cheapest plans so far as a max-heap: entries are the negated cost and
+    # enumeration rank (so ties keep the original combination order), then the plan.
+    best = []
+
+    def offer(total, rank, plan):
+        size, extra = rank
+        entry = (-total, -size, tuple(-i for i in extra), plan)
+        if len(best) < k:
+            heapq.heappush(best, entry)
+        elif entry[:3] > best[0][:3]:
+            heapq.heapreplace(best, entry)
+
+    def add_plan(extra, state):
+        extra = tuple(sorted(extra))  # original option order for reporting
+        mask = fixed_mask | _index_mask(extra)
+        if mask & plus_mask and not mask & halbtax_mask:
+            return
+        combo = fixed_passes + [passes[i] for i in extra]
+
+        ids = fixed_ids + list(extra)
+        rate = _combo_rate(combo)
+        has_halbtax = bool(mask & halbtax_mask)
+        # Python‑int states (see `_mask_dtype`) have no value bytes to key on
+        key = (state.tobytes() if state.dtype != object else tuple(state.tolist()), has_halbtax, rate)
+        if key not in trip_costs:
+            trip_costs[key] = _trip_cost(prepared, prices, state, rate, has_halbtax, jit)
+
+        fee = sum(s.price for s in combo)
+        trips = trip_costs[key]
+        credit = sum(s.credit for s in combo)
+        net = max(0.0, trips - credit)
+        total = fee + net
+
+        offer(total, (len(extra), extra), {
+            "subs": [options[i] for i in ids],
+            "subscription_cost": fee,
+            "other_cost": net,
+            "cost": total
+        })
+
+    def lower_bound(chosen, ids, state):
+        """Cost no plan extending *chosen* with passes from *ids*, whose coverage
+        state is *state*, can undercut."""
+        fee = sum(s.price for s in chosen)
+        rate = _combo_rate([passes[i] for i in ids])
+        trips = float(_trip_lower_bound(prepared, prices, state, rate) @ prepared["count"])
+        credit = sum(passes[i].credit for i in ids)
+        return fee + max(0.0, trips - credit)
+
+    def expand(chosen, extra, p, state):
+        """Search the combos extending *chosen* whose next optional pass is order[p]."""
+        # Cheap check first: Halbtax Plus with no Halbtax left to add
+        mask = fixed_mask | _index_mask(extra) | 1 << order[p]
+        if mask & plus_mask and not (mask | rest_mask[p + 1]) & halbtax_mask:
+            return
+        # Any superset of a combo with a dominated pass is redundant as well
+        ids = fixed_ids + list(extra) + [order[p]]
+        if _is_redundant(ids, dom):
+            return
+        child = chosen + [passes[order[p]]]
+        state = state | rows[order[p]]
+        if len(best) >= k:
+            if lower_bound(child, ids + order[p+1:], state | suffix[p + 1]) > -best[0][0]:
+                return
+        dfs(child, extra + (order[p],), p + 1, state)
+
+    def dfs(chosen, extra, pos, state):
+        add_plan(extra, state)
+        for p in range(pos, len(order)):
+            expand(chosen, extra, p, state)
+
+    # Age & redundancy checks on the fixed passes rule out every combo at once
+    if all(s.price is not None for s in fixed_passes) and not _is_redundant(fixed_ids, dom):
+        state = np.bitwise_or.reduce(rows[fixed_ids], axis=0)
+        dfs(list(fixed_passes), (), 0, state)
 
     # Baseline no‑sub option when no fixed passes
-    if not fixed and not any(len(p["subs"]) == 0 for p in plans):
+    if not fixed and not any(len(p["subs"]) == 0 for *_, p in best):
         base = sum(j["full_price"]*j["count"] for j in journeys)
-        plans.append({"subs": (),"subscription_cost":0.0,"other_cost":base,"cost":base})
+        offer(base, (len(options)+1, ()), {"subs": (),"subscription_cost":0.0,"other_cost":base,"cost":base})
 
-    return sorted(plans, key=lambda x: x["cost"])[:k]
+    return [p for *_, p in sorted(best, reverse=True)]
 
 if __name__ == '__main__':
     # Define your yearly travel patterns here
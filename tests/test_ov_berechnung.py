@@ -0,0 +1,263 @@
+"""Tests for ov_berechnung: zone coverage, single-ticket pricing and the bundled example."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import ov_berechnung as ov  # noqa: E402
+
+# -----------------------------------------------------------------------------
+# Bundled example (the data from the __main__ block of ov_berechnung.py)
+
+EXAMPLE_JOURNEYS = [
+    ################################################################################################
+    { 'name': 'default',        'zones': [110], 'time': '12:00', 'full_price': 4.60, 'count': 584 },
+    { 'name': 'default_early',  'zones': [110], 'time': '08:00', 'full_price': 4.60, 'count': 292 },
+    { 'name': 'default_late',   'zones': [110], 'time': '20:00', 'full_price': 4.60, 'count': 584 },
+    ################################################################################################
+    { 'name': 'family',         'zones': [110, 140, 141, 142], 'time': '12:00', 'full_price': 11.20, 'count': 50 },
+    { 'name': 'family_early',   'zones': [110, 140, 141, 142], 'time': '08:00', 'full_price': 11.20, 'count': 10 },
+    { 'name': 'family_late',    'zones': [110, 140, 141, 142], 'time': '20:00', 'full_price': 11.20, 'count': 44 },
+    ################################################################################################
+    { 'name': 'airport_etc',    'zones': [110, 121], 'time': '12:00', 'full_price': 7.00, 'count': 4 },
+    { 'name': 'airport_etc',    'zones': [110, 121], 'time': '08:00', 'full_price': 7.00, 'count': 10 },
+    { 'name': 'airport_etc',    'zones': [110, 121], 'time': '20:00', 'full_price': 7.00, 'count': 10 },
+    ################################################################################################
+    { 'name': 'work',           'zones': [110, 141], 'time': '12:00', 'full_price': 7.00, 'count': 50},
+    { 'name': 'work_early',     'zones': [110, 141], 'time': '08:00', 'full_price': 7.00, 'count': 42 },
+    { 'name': 'work_late',      'zones': [110, 141], 'time': '20:00', 'full_price':  7.00, 'count': 12 },
+    ################################################################################################
+    { 'name': 'canton',         'zones': 'ZURICH', 'time': '12:00', 'full_price':  17.80, 'count': 10 },
+    { 'name': 'canton_early',   'zones': 'ZURICH', 'time': '08:00', 'full_price':  17.80, 'count': 6 },
+    { 'name': 'canton_late',    'zones': 'ZURICH', 'time': '20:00', 'full_price':  17.80, 'count': 6 },
+    ################################################################################################
+    { 'name': 'suisse',         'zones': 'all', 'time': '12:00', 'full_price': 35.00, 'count':  12 },
+    { 'name': 'suisse_early',   'zones': 'all', 'time': '08:00', 'full_price': 35.00, 'count':  4 },
+    { 'name': 'suisse_late',    'zones': 'all', 'time': '20:00', 'full_price': 35.00, 'count':  8 },
+    ################################################################################################
+    { 'name': 'holiday',          'zones': 'all', 'time': '12:00', 'full_price': 4.60, 'count': 30 },
+    { 'name': 'holiday_early',    'zones': 'all', 'time': '08:00', 'full_price': 4.60, 'count': 10 },
+    { 'name': 'holiday_late',     'zones': 'all', 'time': '20:00', 'full_price': 4.60, 'count': 30 },
+    ################################################################################################
+]
+
+EXAMPLE_OPTIONS = [
+    {
+        'name': 'no_sub', 
+        'price': {24:0,25:0,26:0}, 
+        'coverage': {'type':'none'}
+    },
+    {
+        'name': 'halbtax', 
+        'price': {24:100,25:190,26:170}, 
+        'coverage': {'type':'discount','rate':0.5}
+    },
+    {
+        'name': 'halbtax_plus_level1',
+        'price': {24:600, 25:800, 26:800},
+        'coverage': {'type':'discount','rate':0.5},
+        'credit':   {24:1000, 25:1000, 26:1000}
+    },
+    {
+        'name': 'halbtax_plus_level2',
+        'price': {24:1125, 25:1500, 26:1500},
+        'coverage': {'type':'discount','rate':0.5},
+        'credit':   {24:2000, 25:2000, 26:2000}
+    },
+    {
+        'name': 'halbtax_plus_level3',
+        'price': {24:1575, 25:2100, 26:2100},
+        'coverage': {'type':'discount','rate':0.5},
+        'credit':   {24:3000, 25:3000, 26:3000}
+    },
+    {
+        'name':     'night_GA',      # Night-GA: free travel 19:00-05:00
+        'price':    {24: 100},
+        'coverage': {'type': 'unlimited', 'zones': 'all', 'times': ('19:00', '05:00')}
+    },
+    {
+        'name':     'GA',      # Generalabonnement for all Switzerland
+        'price':    {24: 2780, 25: 3495, 26: 3995},
+        'coverage': {'type': 'unlimited', 'zones': 'all', 'times': ('00:00', '23:59')}
+    },
+    {
+        'name':     'ZVV_110',
+        'price':    {24: 586,  25: 809,  26: 809},
+        'coverage': {'type': 'unlimited', 'zones': [110], 'times': ('00:00', '23:59')}
+    },
+    {
+        'name':     'ZVV_110_140', # Work
+        'price':    {24: 861,  25:1189,  26:1189},
+        'coverage': {'type': 'unlimited', 'zones': [110, 140], 'times': ('00:00', '23:59')}
+    },
+    {
+        'name':     'ZVV_9_Uhr_110_111_121_140_150_154_155',
+        'price':    {24: 827,  25:  827,  26:   827},
+        'coverage': {'type': 'unlimited', 'zones': [110, 111, 121, 140, 150, 154, 155], 'times': ('09:00', '05:00')}
+    },
+    {
+        'name':     'ZVV_9_Uhr_ZURICH',
+        'price':    {24: 1282,  25:  1282,  26:   1282},
+        'coverage': {'type': 'unlimited', 'zones': ['ZURICH'], 'times': ('09:00', '05:00')}
+    },
+    {
+        'name':     'ZVV_110_140_141_142',  # Family
+        'price':    {24:1393, 25:1922,  26:1922.},
+        'coverage': {'type': 'unlimited', 'zones': [110, 140, 141, 142], 'times': ('00:00', '23:59')}
+    },
+    {
+        'name':     'ZVV_ZURICH',  # Canton of Zurich
+        'price':    {24:1663, 25:2295,  26:2295},
+        'coverage': {'type': 'unlimited', 'zones': ['ZURICH'], 'times': ('00:00', '23:59')}
+    }
+]
+
+# -----------------------------------------------------------------------------
+# Zone coverage
+
+BITS = {110: 0, 140: 1, 141: 2}
+
+
+def mask(zones):
+    return ov._encode_zones(zones, BITS)
+
+
+@pytest.mark.parametrize("cov, req, expected", [
+    ("all", "all", True),
+    ("all", "ZURICH", True),
+    ("all", [110, 141], True),
+    ("ZURICH", "ZURICH", True),
+    ("ZURICH", [110, 140, 141], True),
+    ("ZURICH", "all", False),            # canton does not cover Switzerland-wide
+    ([110, 140, 141], [110, 141], True),
+    ([110, 141], [110, 141], True),
+    ([110], [110, 141], False),
+    ([110, 140, 141], "ZURICH", False),  # numbered zones never cover the canton
+    ([110, 140, 141], "all", False),
+])
+def test_covers(cov, req, expected):
+    assert bool(ov._covers(mask(cov), mask(req))) is expected
+
+
+def test_covers_arrays():
+    cov = np.array([mask("all"), mask("ZURICH"), mask([110])], dtype=np.uint64)
+    req = np.array([mask("all"), mask("all"), mask([110])], dtype=np.uint64)
+    assert ov._covers(cov, req).tolist() == [True, False, True]
+
+# -----------------------------------------------------------------------------
+# Single-ticket pricing
+
+NO_SUB = {"name": "no_sub", "price": {24: 0}, "coverage": {"type": "none"}}
+HALBTAX = {"name": "halbtax", "price": {24: 190}, "coverage": {"type": "discount", "rate": 0.5}}
+NIGHT_GA = {"name": "night_GA", "price": {24: 99},
+            "coverage": {"type": "unlimited", "zones": "all", "times": ("19:00", "05:00")}}
+
+
+def zone_pass(zone):
+    return {"name": f"ZVV_{zone}", "price": {24: 500}, "coverage": {"type": "unlimited", "zones": [zone]}}
+
+
+def trip_cost(zones, time, full_price, passes):
+    """Single-ticket cost of one journey with all *passes* fixed."""
+    journey = {"name": "j", "zones": zones, "time": time, "full_price": full_price, "count": 1}
+    plans = ov.top_k_plans([journey], [NO_SUB] + passes, 24, k=1,
+                           fixed_sub_names=[s["name"] for s in passes])
+    return plans[0]["other_cost"]
+
+
+@pytest.mark.parametrize("zones, passes, expected", [
+    ([110, 141], [zone_pass(110)], ov.EXT_PRICES["1-2"]),                     # 1 missing zone
+    ([110, 141], [zone_pass(110), HALBTAX], ov.EXT_PRICES["1-2 (halbtax)"]),  # dearer with Halbtax
+    ([110], [zone_pass(141)], ov.EXT_PRICES["1-2"]),                          # zone 110 counts twice
+    ([110, 140], [zone_pass(141)], ov.EXT_PRICES["3"]),
+    ([110, 140, 142], [zone_pass(141)], ov.EXT_PRICES["4+"]),
+    ("ZURICH", [zone_pass(110)], 7.00),              # full fare, no extension beyond numbered zones
+])
+def test_extension_tickets(zones, passes, expected):
+    assert trip_cost(zones, "08:00", 7.00, passes) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("time, passes, expected", [
+    ("20:00", [NIGHT_GA], 0.0),
+    ("04:30", [NIGHT_GA], 0.0),                      # window wraps past midnight
+    ("12:00", [NIGHT_GA], 35.00),
+    ("12:00", [NIGHT_GA, HALBTAX], 17.50),
+])
+def test_time_windows(time, passes, expected):
+    assert trip_cost("all", time, 35.00, passes) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("covered, expected", [
+    (range(1000, 1070), 0.0),
+    (range(1000, 1068), ov.EXT_PRICES["1-2"]),       # 2 missing zones
+    (range(2000, 2010), ov.EXT_PRICES["4+"]),        # no overlap, 4+ zone extension
+])
+def test_more_than_62_zones(covered, expected):
+    wide = {"name": "wide", "price": {24: 50}, "coverage": {"type": "unlimited", "zones": list(covered)}}
+    assert trip_cost(list(range(1000, 1070)), "08:00", 7.00, [wide]) == pytest.approx(expected)
+
+# -----------------------------------------------------------------------------
+# Plans for the bundled example
+
+def summary(plans):
+    return [([s["name"] for s in p["subs"]], p["subscription_cost"], round(p["other_cost"], 2))
+            for p in plans]
+
+
+def test_example_fixed_passes():
+    plans = ov.top_k_plans(EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 24, k=5, fixed_sub_names=["night_GA", "halbtax"])
+    assert summary(plans) == [
+        (["halbtax", "night_GA", "halbtax_plus_level2", "ZVV_110"], 1911, 0.0),
+        (["halbtax", "night_GA", "halbtax_plus_level1", "ZVV_110"], 1386, 612.8),
+        (["halbtax", "night_GA", "halbtax_plus_level3"], 1775, 236.2),
+        (["halbtax", "night_GA", "halbtax_plus_level1", "halbtax_plus_level2"], 1925, 236.2),
+        (["halbtax", "night_GA", "halbtax_plus_level2", "ZVV_110_140"], 2186, 0.0),
+    ]
+
+
+def test_example_free_choice():
+    plans = ov.top_k_plans(EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 24, k=5)
+    assert summary(plans) == [
+        (["halbtax", "halbtax_plus_level2", "night_GA", "ZVV_110"], 1911, 0.0),
+        (["halbtax", "halbtax_plus_level1", "night_GA", "ZVV_110"], 1386, 612.8),
+        (["halbtax", "halbtax_plus_level3", "night_GA"], 1775, 236.2),
+        (["halbtax", "halbtax_plus_level1", "ZVV_110_140_141_142"], 2093, 0.0),
+        (["halbtax", "halbtax_plus_level2", "ZVV_110"], 1811, 324.0),
+    ]
+
+
+def test_example_age_26():
+    plans = ov.top_k_plans(EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 26, k=5, fixed_sub_names=["halbtax"])
+    assert summary(plans) == [
+        (["halbtax", "halbtax_plus_level1", "ZVV_9_Uhr_ZURICH"], 2252, 544.0),
+        (["halbtax", "halbtax_plus_level2", "ZVV_110"], 2479, 324.0),
+        (["halbtax", "halbtax_plus_level1", "ZVV_110_140_141_142"], 2892.0, 0.0),
+        (["halbtax", "halbtax_plus_level2", "ZVV_9_Uhr_ZURICH"], 2952, 0.0),
+        (["halbtax", "ZVV_9_Uhr_ZURICH"], 1452, 1544.0),
+    ]
+
+
+def test_unpriced_fixed_pass_gives_no_plans():
+    # night_GA has no price for age 25
+    assert ov.top_k_plans(EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 25, k=5, fixed_sub_names=["night_GA", "halbtax"]) == []
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_non_positive_k(k):
+    assert ov.top_k_plans(EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 24, k=k) == []
+
+
+def test_compiled_scoring_matches():
+    pytest.importorskip("numba")
+    args = (EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 24)
+    assert summary(ov.top_k_plans(*args, k=20, jit=True)) == summary(ov.top_k_plans(*args, k=20))
+
+
+@pytest.mark.parametrize("fixed", [None, ["night_GA", "halbtax"]])
+def test_direct_pricing_fallback_matches(monkeypatch, fixed):
+    args = (EXAMPLE_JOURNEYS, EXAMPLE_OPTIONS, 24)
+    expected = summary(ov.top_k_plans(*args, k=20, fixed_sub_names=fixed))
+    monkeypatch.setattr(ov, "_MAX_TABLE_WIDTH", 0)  # no price table: price each combo directly
+    assert summary(ov.top_k_plans(*args, k=20, fixed_sub_names=fixed)) == expected